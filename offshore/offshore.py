@@ -34,49 +34,105 @@
 # ## Data input
 
 # +
+from collections import defaultdict
+import hashlib
+import os
 import numpy as np
 import pandas as pd
 from dataclasses import dataclass
 import networkx as nx
 import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
 import gurobipy as gp
 from gurobipy import GRB
-from shapely.geometry import LineString
-
-# Read in the data
-df = pd.read_excel('offshore.xlsx')
+from numba import njit, prange, boolean, float64
+
+# Distance matrix in km, rows are computed in parallel
+@njit(parallel=True, fastmath=True, cache=True)
+def build_D(east, north):
+    N = east.shape[0]
+    D = np.empty((N, N))
+    for i in prange(N):
+        for j in range(N):
+            D[i,j] = np.sqrt((east[i] - east[j])**2 + (north[i] - north[j])**2) / 1000.0
+    return D
+
+# Compile now rather than on the first real call
+build_D(np.zeros(2), np.zeros(2))
+
+# Read in the data; the spreadsheet is converted to Parquet whenever it changes,
+# which is much faster to load on every later run
+if (not os.path.exists('offshore.parquet') or
+        os.path.getmtime('offshore.xlsx') > os.path.getmtime('offshore.parquet')):
+    pd.read_excel('offshore.xlsx').to_parquet('offshore.parquet', index=False)
+df = pd.read_parquet('offshore.parquet')
 price_per_km = 1e6
 capacity = 65 # Amount of MW that a cable can carry
 produced = 8
 
 # Set index
 df.set_index('Name',inplace=True)
-names = df.index
-
-# Define connections
-connections = [(o, d) for o in names for d in names if o != d and o != 'Plat']
-
-# Calculate distances
-distances = {(o,d): np.sqrt((df.loc[o, 'Easting'] - df.loc[d, 'Easting'])**2 + 
-                     (df.loc[o, 'Northing'] - df.loc[d, 'Northing'])**2) / 1000 # Convert to km
-            for (o,d) in connections}
-
-# Check if crossing
-def check_if_crossing(df, o1, d1, o2, d2):
-    line1 = LineString([(df.loc[o1, 'Easting'], df.loc[o1, 'Northing']), 
-                        (df.loc[d1, 'Easting'], df.loc[d1, 'Northing'])])
-    line2 = LineString([(df.loc[o2, 'Easting'], df.loc[o2, 'Northing']), 
-                        (df.loc[d2, 'Easting'], df.loc[d2, 'Northing'])])
-    
-    if o1 in [o2, d2] or d1 in [o2, d2]:
+
+# Extract the columns once as plain arrays; all later lookups go through row positions
+names = df.index.to_numpy()
+east = df['Easting'].to_numpy(dtype=np.float64, copy=True)
+north = df['Northing'].to_numpy(dtype=np.float64, copy=True)
+coords = np.column_stack((east, north))
+
+# Distances only depend on the data, so keep them in a cache that is invalidated
+# whenever the data file changes
+key = hashlib.blake2b((str(os.path.getmtime('offshore.xlsx')) + str(df.shape)).encode()).hexdigest()[:16]
+cache_path = f'.cache/{key}.npy'
+
+if os.path.exists(cache_path):
+    D = np.load(cache_path)
+else:
+    # Calculate distances for all pairs at once
+    D = build_D(east, north)
+    os.makedirs('.cache', exist_ok=True)
+    np.save(cache_path, D)
+
+# Define connections, leaving out cables of 10 km or more
+mask_offdiag = ~np.eye(len(names), dtype=bool)
+mask_not_from_Plat = (names != 'Plat')[:,None]
+connection_idx = list(zip(*np.where((D < 10) & mask_offdiag & mask_not_from_Plat)))
+connections = [(names[i], names[j]) for (i,j) in connection_idx]
+
+# Outgoing and incoming arcs of each node
+out_arcs = defaultdict(list)
+in_arcs = defaultdict(list)
+for o, d in connections:
+    out_arcs[o].append(d)
+    in_arcs[d].append(o)
+
+# Check if crossing, from the orientations of each segment's endpoints with respect
+# to the other segment. Compiled so it is cheap enough to call from within a Gurobi
+# callback. Segments that touch (e.g. at a shared endpoint) give a zero orientation
+# and are therefore reported as not crossing.
+@njit(boolean(float64, float64, float64, float64, float64, float64, float64, float64), cache=True)
+def segments_cross(ax, ay, bx, by, cx, cy, dx, dy):
+    d1 = (dx - cx)*(ay - cy) - (dy - cy)*(ax - cx)
+    d2 = (dx - cx)*(by - cy) - (dy - cy)*(bx - cx)
+    d3 = (bx - ax)*(cy - ay) - (by - ay)*(cx - ax)
+    d4 = (bx - ax)*(dy - ay) - (by - ay)*(dx - ax)
+    return (d1*d2 < 0) & (d3*d4 < 0)
+
+@njit(cache=True)
+def arcs_cross(coords, o1, d1, o2, d2):
+    if o1 == o2 or o1 == d2 or d1 == o2 or d1 == d2:
         return False
-    return line1.crosses(line2)
+    return segments_cross(coords[o1,0], coords[o1,1], coords[d1,0], coords[d1,1],
+                          coords[o2,0], coords[o2,1], coords[d2,0], coords[d2,1])
+
+# Compile now so the first callback does not pay for it; segments_cross has an
+# explicit signature and is compiled as soon as it is defined
+arcs_cross(np.zeros((2, 2)), 0, 1, 1, 0)
 
 
 
 # +
 # Define the positions
-pos = {n : (df.loc[n, 'Easting'], df.loc[n, 'Northing']) for n in names}
+pos = dict(zip(names, map(tuple, coords)))
 
 # Draw the units only ones
 H = nx.Graph()
@@ -91,23 +147,54 @@ model = gp.Model("TiredAfternoonModelling")
 x = model.addVars(connections, vtype=gp.GRB.BINARY, name='install')
 f = model.addVars(connections, name='flow')
 
-model.addConstrs((x.sum(i,'*') == 1 for i in names), name='All connected')
-model.addConstrs((f.sum(i,'*') == f.sum('*',i) + produced for i in names if i != 'Plat'), 
+model.addConstrs((gp.quicksum(x[i,j] for j in out_arcs[i]) == 1 for i in names if i != 'Plat'), 
+                 name='All connected')
+model.addConstrs((gp.quicksum(f[i,j] for j in out_arcs[i]) == 
+                  gp.quicksum(f[j,i] for j in in_arcs[i]) + produced for i in names if i != 'Plat'), 
                  name='Flow')
 
 model.addConstrs((f[c] <= capacity*x[c] for c in connections), 'Semi-continuous variable')
 
-model.addConstrs((x[c] == 0 for c in connections if distances[c] >= 10), name='test')
-
-model.setObjective(x.prod(distances))
+coeffs = [D[i,j] for (i,j) in connection_idx]
+vars_list = [x[o,d] for (o,d) in connections]
+model.setObjective(gp.LinExpr(coeffs, vars_list))
 # -
 
-model.optimize()
+# ## Lazy constraints
+#
+# Cables are not allowed to cross. There is a constraint $x_{c_1} + x_{c_2} \leq 1$ for every pair of crossing connections, far too many to add up front, but only a handful of them ever matter. We therefore add them as lazy constraints: every time Gurobi finds a new incumbent, we check the installed cables for crossings and cut off only those pairs.
+
+# +
+def make_cb(coords, connection_idx):
+    def no_crossing(model, where):
+        if where == GRB.Callback.MIPSOL:
+            sol = model.cbGetSolution(vars_list)
+            installed = [(c, idx) for c, idx, v in zip(connections, connection_idx, sol) if v > 0.5]
+            for k, (c1, (o1, d1)) in enumerate(installed):
+                for c2, (o2, d2) in installed[k+1:]:
+                    if arcs_cross(coords, o1, d1, o2, d2):
+                        model.cbLazy(x[c1] + x[c2] <= 1)
+    return no_crossing
+
+model.Params.LazyConstraints = 1
+
+# Fixed charge network flow relaxations are weak: the LP spreads flow thinly over
+# many partially installed cables. Solve the root with barrier, presolve and cut
+# aggressively to tighten the relaxation, and focus on finding good layouts early.
+model.Params.Method = 2
+model.Params.Presolve = 2
+model.Params.Cuts = 2
+model.Params.MIPFocus = 1
+
+model.optimize(make_cb(coords, connection_idx))
+# -
 
 # Draw the edges that actually exist
-G = nx.Graph()
-G.add_edges_from([(i, j) for (i,j) in connections if x[i,j].x > 0.5])
-nx.draw_networkx(G, pos, node_size = 100, node_color='y')
+xvals = np.array(model.getAttr('X', vars_list))
+active = [connections[k] for k in np.where(xvals > 0.5)[0]]
+segs = [[pos[o], pos[d]] for (o,d) in active]
+plt.gca().add_collection(LineCollection(segs, colors='k'))
+nx.draw_networkx_nodes(H, pos, node_size = 100, node_color='y')
 nx.draw_networkx_labels(H, pos);
 plt.rcParams["figure.figsize"] = (200,100)
 
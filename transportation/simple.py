@@ -10,6 +10,7 @@
 
 # %%
 import gurobipy as gp
+import numpy as np
 
 
 DC = ['seattle','san-diego']
@@ -26,6 +27,9 @@ Distances = {
 }
 Price = 90  # $/[1000km * unit]
 
+# Distances as a dense DC x FC matrix
+D = np.array([[Distances[(i,j)] for j in FC] for i in DC])
+
 # %%
 model = gp.Model("AMLC2021")
 
@@ -34,7 +38,9 @@ x = model.addVars(DC, FC, name='flow')
 model.addConstrs((x.sum(i,'*') <= Capacity[i] for i in DC), name='Capacity')
 model.addConstrs((x.sum('*',j) >= Demand[j] for j in FC), name='Demand')
 
-model.setObjective(Price*x.prod(Distances))
+coeffs = (Price*D).ravel().tolist()
+vars_ = [x[i,j] for i in DC for j in FC]
+model.setObjective(gp.LinExpr(coeffs, vars_))
 
 
 # %%
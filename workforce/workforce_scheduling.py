@@ -34,6 +34,7 @@
 # This command imports the Gurobi functions and classes.
 
 import gurobipy as gp
+import numpy as np
 import pandas as pd
 
 from pylab import *
@@ -59,15 +60,8 @@ shifts, shiftRequirements = gp.multidict({
   "Sat13": 7,
   "Sun14": 5 })
 
-# Amount each worker is paid to work one shift.
-workers, pay = gp.multidict({
-  "Amy":   10,
-  "Bob":   12,
-  "Cathy": 10,
-  "Dan":   8,
-  "Ed":    8,
-  "Fred":  9,
-  "Gu":    11 })
+# Employed workers.
+workers = ["Amy", "Bob", "Cathy", "Dan", "Ed", "Fred", "Gu"]
 
 # Worker availability: defines on which day each employed worker is available.
 # The Gurobi tuple list is a sub-class of the Python list class that is designed to efficiently
@@ -99,21 +93,38 @@ availability = gp.tuplelist([
 ('Gu', 'Sun14')
 ])
 
+# Availability as a boolean worker x shift matrix, from which we read off the workers
+# available for each shift and the shifts each worker is available for.
+w_idx = {w: i for i, w in enumerate(workers)}
+s_idx = {s: j for j, s in enumerate(shifts)}
+A = np.zeros((len(workers), len(shifts)), dtype=bool)
+for w, s in availability:
+    A[w_idx[w], s_idx[s]] = True
+shift_to_workers = [np.where(A[:,j])[0] for j in range(len(shifts))]
+worker_to_shifts = [np.where(A[i,:])[0] for i in range(len(workers))]
+
+# Shift requirements by shift position, used as right-hand sides below.
+req = np.array([shiftRequirements[s] for s in shifts], dtype=np.int32)
+
 # %%
 model = gp.Model("Scheduling")
 
 y = model.addVars(availability, vtype=gp.GRB.BINARY, name='Tired')
-x = model.addVars(workers, name='VeryTired')
 n = model.addVars(shifts, name='ExhaustedGoGermany')
 maxWork = model.addVar()
 minWork = model.addVar()
 
-model.addConstrs((y.sum('*',s) + n[s] == shiftRequirements[s] for s in shifts), 
-                 name='JustGoToWork')
-model.addConstrs((y.sum(w,'*') == x[w] for w in workers), name='Workers')
+model.addConstrs((gp.quicksum(y[workers[i],s] for i in shift_to_workers[j]) + n[s] == req[j] 
+                  for j, s in enumerate(shifts)), name='JustGoToWork')
+
+# Number of shifts each worker is assigned to
+work_expr = {w: gp.quicksum(y[w,shifts[j]] for j in worker_to_shifts[i]) 
+             for i, w in enumerate(workers)}
 
-model.addConstr(maxWork == gp.max_(x), name="maxconstr")
-model.addConstr(minWork == gp.min_(x), name="minconstr")
+# maxWork - minWork is minimized, so bounding it from both sides suffices and avoids
+# the general max_/min_ constraints.
+model.addConstrs((maxWork >= work_expr[w] for w in workers), name="maxconstr")
+model.addConstrs((minWork <= work_expr[w] for w in workers), name="minconstr")
 
 model.setObjectiveN(n.sum(), 0)
 model.setObjectiveN(maxWork - minWork, 1)